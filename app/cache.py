@@ -4,11 +4,14 @@ from __future__ import annotations
 from dataclasses import dataclass
 from threading import RLock
 from time import monotonic
-from typing import Generic, MutableMapping, Optional, TypeVar
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
 
 K = TypeVar("K")
 V = TypeVar("V")
 
+_SHARD_COUNT = 16  # must stay a power of two for the mask below
+_SHARD_MASK = _SHARD_COUNT - 1
+
 
 @dataclass
 class _Entry(Generic[V]):
@@ -17,39 +20,55 @@ class _Entry(Generic[V]):
 
 
 class TTLCache(Generic[K, V]):
-    """Thread-safe TTL cache keyed by arbitrary hashable objects."""
+    """Thread-safe TTL cache keyed by arbitrary hashable objects.
+
+    Entries are striped across independently locked shards so unrelated keys
+    never contend. Reads skip the lock entirely (single dict lookups are atomic
+    under the GIL); only writes and expiry eviction lock the owning shard.
+    """
 
     def __init__(self, default_ttl: float) -> None:
         if default_ttl <= 0:
             raise ValueError("default_ttl must be > 0")
         self._default_ttl = default_ttl
-        self._items: MutableMapping[K, _Entry[V]] = {}
-        self._lock = RLock()
+        self._shards: List[Tuple[RLock, Dict[K, _Entry[V]]]] = [
+            (RLock(), {}) for _ in range(_SHARD_COUNT)
+        ]
+
+    def _shard(self, key: K) -> Tuple[RLock, Dict[K, _Entry[V]]]:
+        return self._shards[hash(key) & _SHARD_MASK]
 
     def get(self, key: K) -> Optional[V]:
-        with self._lock:
-            entry = self._items.get(key)
-            if not entry:
-                return None
-            if entry.expires_at <= monotonic():
-                self._items.pop(key, None)
-                return None
-            return entry.value
+        lock, items = self._shard(key)
+        entry = items.get(key)
+        if not entry:
+            return None
+        if entry.expires_at <= monotonic():
+            with lock:
+                # Only evict the entry we observed; a concurrent set may have replaced it.
+                if items.get(key) is entry:
+                    del items[key]
+            return None
+        return entry.value
 
     def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
         ttl_value = ttl if ttl is not None else self._default_ttl
         if ttl_value <= 0:
             raise ValueError("ttl must be > 0")
-        with self._lock:
-            self._items[key] = _Entry(value=value, expires_at=monotonic() + ttl_value)
+        lock, items = self._shard(key)
+        entry = _Entry(value=value, expires_at=monotonic() + ttl_value)
+        with lock:
+            items[key] = entry
 
     def invalidate(self, key: Optional[K] = None) -> None:
-        with self._lock:
-            if key is None:
-                self._items.clear()
-            else:
-                self._items.pop(key, None)
+        if key is None:
+            for lock, items in self._shards:
+                with lock:
+                    items.clear()
+            return
+        lock, items = self._shard(key)
+        with lock:
+            items.pop(key, None)
 
     def __contains__(self, key: K) -> bool:  # type: ignore[override]
         return self.get(key) is not None
-
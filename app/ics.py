@@ -2,10 +2,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
-from icalendar import Calendar, Event, Timezone, TimezoneDaylight, TimezoneStandard, vDuration
+from icalendar import Calendar, Timezone, TimezoneDaylight, TimezoneStandard, vDuration
 
 EASTERN = ZoneInfo("America/New_York")
 
@@ -21,46 +21,97 @@ class CalendarEvent:
     status: str = "CONFIRMED"
 
 
-def build_calendar(events: list[CalendarEvent], generated_at: datetime) -> bytes:
-    cal = Calendar()
-    cal.add("PRODID", "-//mbta-cr-ical//EN")
-    cal.add("VERSION", "2.0")
-    cal.add("CALSCALE", "GREGORIAN")
-    cal.add("METHOD", "PUBLISH")
-    cal.add("REFRESH-INTERVAL", vDuration(timedelta(days=1)))
-    cal["REFRESH-INTERVAL"].params["VALUE"] = "DURATION"
-    cal.add("X-PUBLISHED-TTL", vDuration(timedelta(days=1)))
-    cal["X-PUBLISHED-TTL"].params["VALUE"] = "DURATION"
-    cal.add_component(_build_vtimezone())
+_TZID = "America/New_York"
+_FOLD_LIMIT = 75
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", ";": "\\;", ",": "\\,", "\n": "\\n", "\r": ""})
+_DTSTART_PREFIX = f"DTSTART;TZID={_TZID}:"
+_DTEND_PREFIX = f"DTEND;TZID={_TZID}:"
+_LOCAL_FORMAT = "%Y%m%dT%H%M%S"
+_UTC_FORMAT = "%Y%m%dT%H%M%SZ"
+_DATE_FORMAT = "%Y%m%d"
 
-    dtstamp = generated_at.astimezone(EASTERN)
 
-    for ev in events:
-        event = Event()
-        event.add("UID", ev.uid)
-        event.add("SUMMARY", ev.summary)
-        event.add("DESCRIPTION", ev.description)
-        event.add("LOCATION", ev.location)
-        event.add("DTSTAMP", dtstamp)
-        event.add("DTSTART", ev.start.astimezone(EASTERN))
-        event.add("DTEND", ev.end.astimezone(EASTERN))
-        event.add("STATUS", ev.status)
-        cal.add_component(event)
+def build_calendar(events: list[CalendarEvent], generated_at: datetime) -> bytes:
+    buf = bytearray(_HEADER_BYTES)
 
-    return cal.to_ical()
+    dtstamp_str = generated_at.astimezone(timezone.utc).strftime(_UTC_FORMAT)
+    for ev in events:
+        _emit_event(buf, ev, dtstamp_str)
+
+    buf += b"END:VCALENDAR\r\n"
+    return bytes(buf)
+
+
+def _emit_event(buf: bytearray, ev: CalendarEvent, dtstamp_str: str) -> None:
+    """Append one VEVENT block for ``ev`` to ``buf`` as folded CRLF lines."""
+
+    buf += b"BEGIN:VEVENT\r\n"
+    _emit_line(buf, "UID:" + _escape_text(ev.uid))
+    buf += b"DTSTAMP:" + dtstamp_str.encode("ascii") + b"\r\n"
+    buf += (_DTSTART_PREFIX + ev.start.astimezone(EASTERN).strftime(_LOCAL_FORMAT) + "\r\n").encode("ascii")
+    buf += (_DTEND_PREFIX + ev.end.astimezone(EASTERN).strftime(_LOCAL_FORMAT) + "\r\n").encode("ascii")
+    _emit_line(buf, "SUMMARY:" + _escape_text(ev.summary))
+    _emit_line(buf, "DESCRIPTION:" + _escape_text(ev.description))
+    _emit_line(buf, "LOCATION:" + _escape_text(ev.location))
+    _emit_line(buf, "STATUS:" + ev.status)
+    buf += b"END:VEVENT\r\n"
+
+
+def _escape_text(value: str) -> str:
+    return value.translate(_TEXT_ESCAPES)
+
+
+def _emit_line(buf: bytearray, line: str) -> None:
+    """Append a content line folded at 75 octets per RFC 5545 section 3.1."""
+
+    data = line.encode("utf-8")
+    if len(data) <= _FOLD_LIMIT:
+        buf += data
+        buf += b"\r\n"
+        return
+    start = 0
+    limit = _FOLD_LIMIT
+    total = len(data)
+    while total - start > limit:
+        cut = start + limit
+        # Never split a multi-byte UTF-8 sequence: back up past continuation bytes.
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        buf += data[start:cut]
+        buf += b"\r\n "
+        start = cut
+        limit = _FOLD_LIMIT - 1  # continuation lines carry a leading space
+    buf += data[start:]
+    buf += b"\r\n"
 
 
 def build_outage_calendar(message: str, generated_at: datetime) -> bytes:
+    local_now = generated_at.astimezone(EASTERN)
     all_day = CalendarEvent(
         uid=f"mbta-outage-{generated_at.date().isoformat()}",
-        start=generated_at.astimezone(EASTERN).replace(hour=0, minute=0, second=0, microsecond=0),
-        end=generated_at.astimezone(EASTERN).replace(hour=23, minute=59, second=0, microsecond=0),
+        start=local_now.replace(hour=0, minute=0, second=0, microsecond=0),
+        end=local_now.replace(hour=23, minute=59, second=0, microsecond=0),
         summary="MBTA Commuter Rail schedule unavailable",
         description=message,
         location="MBTA Commuter Rail",
         status="TENTATIVE",
     )
-    cal = Calendar()
+
+    buf = bytearray(_HEADER_BYTES)
+    buf += b"BEGIN:VEVENT\r\n"
+    _emit_line(buf, "UID:" + _escape_text(all_day.uid))
+    _emit_line(buf, "DTSTAMP:" + generated_at.astimezone(timezone.utc).strftime(_UTC_FORMAT))
+    _emit_line(buf, "DTSTART;VALUE=DATE:" + all_day.start.strftime(_DATE_FORMAT))
+    _emit_line(buf, "DTEND;VALUE=DATE:" + (all_day.start + timedelta(days=1)).strftime(_DATE_FORMAT))
+    _emit_line(buf, "SUMMARY:" + _escape_text(all_day.summary))
+    _emit_line(buf, "DESCRIPTION:" + _escape_text(all_day.description))
+    _emit_line(buf, "LOCATION:" + _escape_text(all_day.location))
+    _emit_line(buf, "STATUS:" + all_day.status)
+    buf += b"TRANSP:TRANSPARENT\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+    return bytes(buf)
+
+
+def _populate_header(cal: Calendar) -> None:
     cal.add("PRODID", "-//mbta-cr-ical//EN")
     cal.add("VERSION", "2.0")
     cal.add("CALSCALE", "GREGORIAN")
@@ -69,21 +120,6 @@ def build_outage_calendar(message: str, generated_at: datetime) -> bytes:
     cal["REFRESH-INTERVAL"].params["VALUE"] = "DURATION"
     cal.add("X-PUBLISHED-TTL", vDuration(timedelta(days=1)))
     cal["X-PUBLISHED-TTL"].params["VALUE"] = "DURATION"
-    cal.add_component(_build_vtimezone())
-
-    event = Event()
-    event.add("UID", all_day.uid)
-    event.add("SUMMARY", all_day.summary)
-    event.add("DESCRIPTION", all_day.description)
-    event.add("LOCATION", all_day.location)
-    event.add("DTSTAMP", generated_at.astimezone(EASTERN))
-    event.add("DTSTART", all_day.start.date())
-    event.add("DTEND", (all_day.start + timedelta(days=1)).date())
-    event.add("STATUS", all_day.status)
-    event.add("TRANSP", "TRANSPARENT")
-    cal.add_component(event)
-
-    return cal.to_ical()
 
 
 def _build_vtimezone() -> Timezone:
@@ -107,3 +143,15 @@ def _build_vtimezone() -> Timezone:
     tz.add_component(standard)
     tz.add_component(daylight)
     return tz
+
+
+def _build_header_bytes() -> bytes:
+    """Serialize the constant calendar preamble (properties + VTIMEZONE) once."""
+
+    cal = Calendar()
+    _populate_header(cal)
+    cal.add_component(_build_vtimezone())
+    return cal.to_ical().rsplit(b"END:VCALENDAR", 1)[0]
+
+
+_HEADER_BYTES = _build_header_bytes()
@@ -1,13 +1,16 @@
 """FastAPI application serving MBTA commuter rail iCalendar feeds."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
 import os
-from collections import defaultdict
-from datetime import datetime, time, timedelta
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
 from typing import Dict, Iterable, List, Optional, Tuple
 
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import Response
 
 from .cache import TTLCache
@@ -18,9 +21,14 @@ from .resolve import RouteCandidate, StopCandidate, StopIndex, infer_route_and_d
 logger = logging.getLogger(__name__)
 
 DEFAULT_SCHEDULE_TTL = 300.0
+DEFAULT_ROUTE_TTL = 3600.0
 MAX_EVENTS_PER_DAY = 8
 NOON = time(12, 0)
+_NOON_SECONDS = NOON.hour * 3600 + NOON.minute * 60
+_SECONDS_PER_DAY = 86400
+_WALL_EPOCH = date(1970, 1, 1)
 MBTA_TRIP_LINK = "https://www.mbta.com/schedules/{route}/line?trip={trip}"
+CALENDAR_CACHE_CONTROL = "public, max-age=300"
 
 
 def configure_logging() -> None:
@@ -38,12 +46,33 @@ def create_app() -> FastAPI:
         app.state.mbta_client = client
         app.state.stop_index = StopIndex(client)
         app.state.schedule_cache = TTLCache(default_ttl=DEFAULT_SCHEDULE_TTL)
+        app.state.route_cache = TTLCache(default_ttl=DEFAULT_ROUTE_TTL)
+        # Warm up in the background so an unreachable MBTA never delays startup.
+        prewarm = asyncio.create_task(
+            _prewarm_default_stops(
+                app.state.stop_index, (os.getenv("DEFAULT_HOME_STOP"), os.getenv("DEFAULT_WORK_STOP"))
+            )
+        )
         yield
+        prewarm.cancel()
         await client.close()
 
     return FastAPI(title="MBTA CR iCal", version="1.0.0", lifespan=lifespan)
 
 
+async def _prewarm_default_stops(index: StopIndex, queries: Iterable[Optional[str]]) -> None:
+    """Load the stop index and memoize the env-configured default stops."""
+
+    for query in queries:
+        if not query:
+            continue
+        try:
+            await index.resolve(query)
+        except Exception:  # a cache warm-up must never take the service down
+            logger.warning("unable to prewarm default stop %r", query, exc_info=True)
+            return
+
+
 app = create_app()
 
 
@@ -59,6 +88,10 @@ async def get_schedule_cache() -> TTLCache:
     return app.state.schedule_cache
 
 
+async def get_route_cache() -> TTLCache:
+    return app.state.route_cache
+
+
 @app.get("/healthz")
 async def healthz() -> Dict[str, bool]:
     return {"ok": True}
@@ -84,6 +117,7 @@ async def stops(
 
 @app.get("/schedule.ical")
 async def schedule_ical(
+    request: Request,
     home_stop: Optional[str] = Query(None, description="Home origin stop slug/name"),
     work_stop: Optional[str] = Query(None, description="Work destination stop slug/name"),
     days: Optional[int] = Query(None, ge=1, le=30, description="Number of days to include"),
@@ -92,6 +126,7 @@ async def schedule_ical(
     client: MBTAClient = Depends(get_client),
     index: StopIndex = Depends(get_stop_index),
     cache: TTLCache = Depends(get_schedule_cache),
+    route_cache: TTLCache = Depends(get_route_cache),
 ) -> Response:
     home_query = home_stop or os.getenv("DEFAULT_HOME_STOP")
     work_query = work_stop or os.getenv("DEFAULT_WORK_STOP")
@@ -142,17 +177,24 @@ async def schedule_ical(
     window_days = days if days is not None else 14
     window_end = (now + timedelta(days=window_days)).replace(hour=23, minute=59, second=59, microsecond=0)
 
-    try:
-        route, toward_work, toward_home = await infer_route_and_directions(
-            home_choice, work_choice, inference_start, window_end, client
-        )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail={"error": "route_unresolved", "message": str(exc)})
-    except MBTAAPIError as exc:
-        return _service_unavailable(str(exc), now)
+    route_key = (home_choice.stop_id, work_choice.stop_id)
+    if force_refresh:
+        route_cache.invalidate(route_key)
+    inferred = route_cache.get(route_key)
+    if inferred is None:
+        try:
+            inferred = await infer_route_and_directions(
+                home_choice, work_choice, inference_start, window_end, client, index=index
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail={"error": "route_unresolved", "message": str(exc)})
+        except MBTAAPIError as exc:
+            return _service_unavailable(str(exc), now)
+        route_cache.set(route_key, inferred)
+    route, toward_work, toward_home = inferred
 
     try:
-        morning_departures = await _fetch_departures(
+        morning_departures, morning_fingerprint = await _fetch_departures(
             cache,
             client,
             route_id=route.route_id,
@@ -163,7 +205,7 @@ async def schedule_ical(
             window_end=window_end,
             force_refresh=bool(force_refresh),
         )
-        evening_departures = await _fetch_departures(
+        evening_departures, evening_fingerprint = await _fetch_departures(
             cache,
             client,
             route_id=route.route_id,
@@ -177,6 +219,13 @@ async def schedule_ical(
     except MBTAAPIError as exc:
         return _service_unavailable(str(exc), now)
 
+    etag = _calendar_etag(route, home_choice, work_choice, morning_fingerprint, evening_fingerprint)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        not_modified = Response(status_code=304)
+        not_modified.headers["ETag"] = etag
+        not_modified.headers["Cache-Control"] = CALENDAR_CACHE_CONTROL
+        return not_modified
+
     events = _build_events(
         route,
         home_choice,
@@ -187,10 +236,54 @@ async def schedule_ical(
 
     ical_bytes = build_calendar(events, now)
     response = Response(content=ical_bytes, media_type="text/calendar; charset=utf-8")
-    response.headers["Cache-Control"] = "no-store"
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CALENDAR_CACHE_CONTROL
     return response
 
 
+def _calendar_etag(
+    route: RouteCandidate,
+    home: StopCandidate,
+    work: StopCandidate,
+    morning_fingerprint: str,
+    evening_fingerprint: str,
+) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (
+        route.route_id,
+        route.long_name,
+        route.short_name or "",
+        *route.direction_names,
+        home.stop_id,
+        home.stop_name,
+        work.stop_id,
+        work.stop_name,
+        morning_fingerprint,
+        evening_fingerprint,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    # Weak: every render carries a fresh DTSTAMP, so equal tags mean equivalent
+    # calendars rather than byte-identical bodies.
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison, so only the opaque tags must agree.
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
 def _select_pair(
     home_candidates: Iterable[StopCandidate], work_candidates: Iterable[StopCandidate]
 ) -> Tuple[Optional[StopCandidate], Optional[StopCandidate]]:
@@ -202,20 +295,30 @@ def _select_pair(
     return None, None
 
 
-class Departure:
-    __slots__ = (
-        "trip_id",
-        "departure",
-        "arrival",
-        "stop_sequence",
-        "direction_id",
-        "headsign",
-        "service_date",
-        "origin_stop_id",
-        "destination_stop_id",
-    )
+_NO_ARRIVAL = -(2**63)
+
+
+@dataclass
+class DepartureTable:
+    """Departures from one origin stored column-wise (one entry per row in each column).
 
-    def __init__(
+    Times are UTC epoch seconds; arrivals without a destination match hold ``_NO_ARRIVAL``.
+    ``departures_wall`` holds the same departures as Eastern wall-clock seconds since
+    1970-01-01, so ``% 86400`` is the local time of day and ``// 86400`` the local day.
+    """
+
+    trip_ids: List[str] = field(default_factory=list)
+    departures_epoch: array = field(default_factory=lambda: array("q"))
+    departures_wall: array = field(default_factory=lambda: array("q"))
+    arrivals_epoch: array = field(default_factory=lambda: array("q"))
+    stop_sequences: array = field(default_factory=lambda: array("i"))
+    direction_ids: array = field(default_factory=lambda: array("b"))
+    headsigns: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.trip_ids)
+
+    def append(
         self,
         *,
         trip_id: str,
@@ -224,19 +327,34 @@ class Departure:
         stop_sequence: int,
         direction_id: int,
         headsign: str,
-        service_date: datetime,
-        origin_stop_id: str,
-        destination_stop_id: str,
     ) -> None:
-        self.trip_id = trip_id
-        self.departure = departure
-        self.arrival = arrival
-        self.stop_sequence = stop_sequence
-        self.direction_id = direction_id
-        self.headsign = headsign
-        self.service_date = service_date
-        self.origin_stop_id = origin_stop_id
-        self.destination_stop_id = destination_stop_id
+        self.trip_ids.append(trip_id)
+        epoch = int(departure.timestamp())
+        self.departures_epoch.append(epoch)
+        self.departures_wall.append(epoch + int(departure.utcoffset().total_seconds()))
+        self.arrivals_epoch.append(int(arrival.timestamp()) if arrival is not None else _NO_ARRIVAL)
+        self.stop_sequences.append(stop_sequence)
+        self.direction_ids.append(direction_id)
+        self.headsigns.append(headsign)
+
+    def sort_by_departure(self) -> None:
+        order = sorted(range(len(self)), key=self.departures_epoch.__getitem__)
+        self.trip_ids = [self.trip_ids[i] for i in order]
+        self.departures_epoch = array("q", [self.departures_epoch[i] for i in order])
+        self.departures_wall = array("q", [self.departures_wall[i] for i in order])
+        self.arrivals_epoch = array("q", [self.arrivals_epoch[i] for i in order])
+        self.stop_sequences = array("i", [self.stop_sequences[i] for i in order])
+        self.direction_ids = array("b", [self.direction_ids[i] for i in order])
+        self.headsigns = [self.headsigns[i] for i in order]
+
+    def departure_at(self, index: int) -> datetime:
+        return datetime.fromtimestamp(self.departures_epoch[index], EASTERN)
+
+    def arrival_at(self, index: int) -> Optional[datetime]:
+        ts = self.arrivals_epoch[index]
+        if ts == _NO_ARRIVAL:
+            return None
+        return datetime.fromtimestamp(ts, EASTERN)
 
 
 async def _fetch_departures(
@@ -250,7 +368,9 @@ async def _fetch_departures(
     window_start: datetime,
     window_end: datetime,
     force_refresh: bool,
-) -> List[Departure]:
+) -> Tuple[DepartureTable, str]:
+    """Return departures for the window plus a stable fingerprint of their content."""
+
     key = (
         route_id,
         stop.stop_id,
@@ -265,104 +385,179 @@ async def _fetch_departures(
     if cached is not None:
         return cached
 
-    schedules, included = await client.schedules(
-        route_id=route_id,
-        stop_id=stop.stop_id,
-        direction_id=direction_id,
-        start=window_start,
-        end=window_end,
-    )
-    dest_schedules, _ = await client.schedules(
-        route_id=route_id,
-        stop_id=destination.stop_id,
-        direction_id=direction_id,
-        start=window_start,
-        end=window_end,
+    (schedules, included), (dest_schedules, _) = await asyncio.gather(
+        client.schedules(
+            route_id=route_id,
+            stop_id=stop.stop_id,
+            direction_id=direction_id,
+            start=window_start,
+            end=window_end,
+        ),
+        client.schedules(
+            route_id=route_id,
+            stop_id=destination.stop_id,
+            direction_id=direction_id,
+            start=window_start,
+            end=window_end,
+        ),
     )
 
     dest_arrivals = _build_arrival_map(dest_schedules)
 
-    departures: List[Departure] = []
-    for item in schedules:
-        attributes = item.get("attributes", {})
-        departure_raw = attributes.get("departure_time") or attributes.get("arrival_time")
-        if not departure_raw:
-            continue
-        try:
-            departure_dt = datetime.fromisoformat(departure_raw)
-        except ValueError:
-            continue
-        departure_local = departure_dt.astimezone(EASTERN)
-        relationships = item.get("relationships", {})
-        trip_rel = relationships.get("trip", {}) if isinstance(relationships, dict) else {}
-        trip_data = trip_rel.get("data", {}) if isinstance(trip_rel, dict) else {}
-        trip_id = trip_data.get("id")
-        if not trip_id:
-            continue
-        trip_info = included.get(("trip", trip_id), {})
-        trip_attrs = trip_info.get("attributes", {}) if isinstance(trip_info, dict) else {}
-        headsign = trip_attrs.get("headsign") or trip_attrs.get("name") or stop.route_name
-        dir_id = trip_attrs.get("direction_id")
-        direction_value = direction_id if not isinstance(dir_id, int) else dir_id
-        stop_sequence = attributes.get("stop_sequence") or 0
-        service_date = departure_local.date().isoformat()
-        arrival_local = dest_arrivals.get((trip_id, service_date))
-        if arrival_local is None:
-            next_day = (departure_local + timedelta(days=1)).date().isoformat()
-            arrival_local = dest_arrivals.get((trip_id, next_day))
-        departures.append(
-            Departure(
+    departures = DepartureTable()
+    # Bind hot-loop callables to locals; attribute and global lookups add up per row.
+    append = departures.append
+    parse_ts = _parse_mbta_ts
+    arrival_for = dest_arrivals.get
+    included_get = included.get
+    one_day = timedelta(days=1)
+    try:
+        for item in schedules:
+            attributes = item.get("attributes", {})
+            departure_raw = attributes.get("departure_time") or attributes.get("arrival_time")
+            if not departure_raw:
+                continue
+            try:
+                departure_local = parse_ts(departure_raw)
+            except ValueError:
+                continue
+            relationships = item.get("relationships", {})
+            trip_rel = relationships.get("trip", {}) if isinstance(relationships, dict) else {}
+            trip_data = trip_rel.get("data", {}) if isinstance(trip_rel, dict) else {}
+            trip_id = trip_data.get("id")
+            if not trip_id:
+                continue
+            trip_info = included_get(("trip", trip_id), {})
+            trip_attrs = trip_info.get("attributes", {}) if isinstance(trip_info, dict) else {}
+            headsign = trip_attrs.get("headsign") or trip_attrs.get("name") or stop.route_name
+            dir_id = trip_attrs.get("direction_id")
+            direction_value = direction_id if not isinstance(dir_id, int) else dir_id
+            stop_sequence = attributes.get("stop_sequence") or 0
+            service_date = departure_local.date().isoformat()
+            arrival_local = arrival_for((trip_id, service_date))
+            if arrival_local is None:
+                next_day = (departure_local + one_day).date().isoformat()
+                arrival_local = arrival_for((trip_id, next_day))
+            append(
                 trip_id=trip_id,
                 departure=departure_local,
                 arrival=arrival_local,
                 stop_sequence=int(stop_sequence),
                 direction_id=direction_value,
                 headsign=headsign,
-                service_date=departure_local,
-                origin_stop_id=stop.stop_id,
-                destination_stop_id=destination.stop_id,
             )
+    finally:
+        _release_dict(dest_arrivals)
+
+    departures.sort_by_departure()
+    fingerprint = _departures_fingerprint(departures)
+    cache.set(key, (departures, fingerprint))
+    return departures, fingerprint
+
+
+def _departures_fingerprint(departures: DepartureTable) -> str:
+    rows = sorted(
+        zip(
+            departures.trip_ids,
+            departures.departures_epoch,
+            departures.arrivals_epoch,
+            departures.stop_sequences,
+            departures.direction_ids,
+            departures.headsigns,
         )
-
-    departures.sort(key=lambda d: d.departure)
-    cache.set(key, departures)
-    return departures
+    )
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        digest.update("\x1f".join(map(str, row)).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
 
 
 def _build_arrival_map(data: List[Dict[str, object]]) -> Dict[Tuple[str, str], datetime]:
-    arrivals: Dict[Tuple[str, str], datetime] = {}
+    """Map ``(trip_id, service_date)`` to the latest arrival; release via ``_release_dict``."""
+
+    arrivals: Dict[Tuple[str, str], datetime] = _acquire_dict()
     for item in data:
-        if not isinstance(item, dict):
-            continue
-        relationships = item.get("relationships", {})
-        trip = relationships.get("trip", {}) if isinstance(relationships, dict) else {}
-        trip_id = trip.get("data", {}).get("id") if isinstance(trip, dict) else None
-        if not trip_id:
-            continue
-        attributes = item.get("attributes", {})
-        if not isinstance(attributes, dict):
+        # Trust the JSON:API schema; any structural surprise means the row is unusable.
+        try:
+            trip_id = item["relationships"]["trip"]["data"]["id"]
+            attributes = item["attributes"]
+            raw_time = attributes.get("arrival_time") or attributes.get("departure_time")
+        except (KeyError, TypeError, AttributeError):
             continue
-        raw_time = attributes.get("arrival_time") or attributes.get("departure_time")
-        if not isinstance(raw_time, str):
+        if not trip_id or not isinstance(raw_time, str):
             continue
         try:
-            dt = datetime.fromisoformat(raw_time).astimezone(EASTERN)
+            dt = _parse_mbta_ts(raw_time)
         except ValueError:
             continue
-        service_date = dt.date().isoformat()
-        key = (trip_id, service_date)
-        current = arrivals.get(key)
-        if current is None or dt > current:
+        key = (trip_id, f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}")
+        if (current := arrivals.get(key)) is None or dt > current:
             arrivals[key] = dt
     return arrivals
 
 
+_FIXED_OFFSETS: Dict[int, timezone] = {}
+
+# Scratch containers reused across requests to spare the allocator on hot paths.
+_POOL_LIMIT = 64
+_DICT_POOL: List[dict] = []
+_LIST_POOL: List[list] = []
+
+
+def _acquire_dict() -> dict:
+    return _DICT_POOL.pop() if _DICT_POOL else {}
+
+
+def _release_dict(value: dict) -> None:
+    value.clear()
+    if len(_DICT_POOL) < _POOL_LIMIT:
+        _DICT_POOL.append(value)
+
+
+def _acquire_list() -> list:
+    return _LIST_POOL.pop() if _LIST_POOL else []
+
+
+def _release_list(value: list) -> None:
+    value.clear()
+    if len(_LIST_POOL) < _POOL_LIMIT:
+        _LIST_POOL.append(value)
+
+
+def _parse_mbta_ts(raw: str) -> datetime:
+    """Parse an MBTA ``YYYY-MM-DDTHH:MM:SS±HH:MM`` timestamp into Eastern time.
+
+    Slices the fixed layout MBTA emits instead of going through ``fromisoformat``
+    and ``astimezone``; anything else falls back to the general parser.
+    Raises ``ValueError`` for malformed input.
+    """
+
+    if len(raw) != 25 or raw[10] != "T" or raw[22] != ":" or raw[19] not in "+-":
+        return datetime.fromisoformat(raw).astimezone(EASTERN)
+    offset_minutes = int(raw[20:22]) * 60 + int(raw[23:25])
+    if raw[19] == "-":
+        offset_minutes = -offset_minutes
+    year, month, day = int(raw[0:4]), int(raw[5:7]), int(raw[8:10])
+    hour, minute, second = int(raw[11:13]), int(raw[14:16]), int(raw[17:19])
+    offset = _FIXED_OFFSETS.get(offset_minutes)
+    if offset is None:
+        offset = _FIXED_OFFSETS[offset_minutes] = timezone(timedelta(minutes=offset_minutes))
+    # Common case: the wall time is already Eastern, so attach the zone directly.
+    # fold=1 selects the second (standard-time) occurrence of an ambiguous hour.
+    for fold in (0, 1):
+        local = datetime(year, month, day, hour, minute, second, tzinfo=EASTERN, fold=fold)
+        if local.utcoffset() == offset.utcoffset(None):
+            return local
+    return datetime(year, month, day, hour, minute, second, tzinfo=offset).astimezone(EASTERN)
+
+
 def _build_events(
     route: RouteCandidate,
     home: StopCandidate,
     work: StopCandidate,
-    morning: List[Departure],
-    evening: List[Departure],
+    morning: DepartureTable,
+    evening: DepartureTable,
 ) -> List[CalendarEvent]:
     events: List[CalendarEvent] = []
     events.extend(
@@ -391,53 +586,71 @@ def _departures_to_events(
     *,
     origin: StopCandidate,
     destination: StopCandidate,
-    departures: List[Departure],
+    departures: DepartureTable,
     before_noon: bool,
 ) -> List[CalendarEvent]:
-    grouped: Dict[str, List[Departure]] = defaultdict(list)
-    for departure in departures:
-        local_dt = departure.departure
-        if before_noon and local_dt.time() >= NOON:
-            continue
-        if not before_noon and local_dt.time() < NOON:
-            continue
-        service_key = local_dt.date().isoformat()
-        grouped[service_key].append(departure)
-
-    events: List[CalendarEvent] = []
-    for service_date, per_day in grouped.items():
-        per_day.sort(key=lambda d: d.departure)
-        limited = per_day[:MAX_EVENTS_PER_DAY]
-        for dep in limited:
-            if dep.arrival:
-                end_time = dep.arrival if dep.arrival > dep.departure else dep.departure + timedelta(minutes=1)
-            else:
-                end_time = dep.departure + timedelta(minutes=5)
-            direction_name = _direction_name(route, dep.direction_id)
-            time_str = dep.departure.strftime("%I:%M %p").lstrip("0")
-            route_label = route.short_name or route.long_name
-            summary = f"CR {route_label} – Trip {dep.trip_id} – {direction_name} – {time_str}"
-            description_lines = [
-                f"Route: {route.long_name}",
-                f"Origin: {origin.stop_name}",
-                f"Destination: {destination.stop_name}",
-                f"Headsign: {dep.headsign}",
-                f"Direction: {direction_name}",
-                f"Trip: {dep.trip_id}",
-                f"Stop sequence: {dep.stop_sequence}",
-                f"Link: {MBTA_TRIP_LINK.format(route=route.route_id, trip=dep.trip_id)}",
-            ]
-            events.append(
-                CalendarEvent(
-                    uid=f"mbta-{route.route_id}-{dep.trip_id}-{dep.origin_stop_id}-{service_date}",
-                    start=dep.departure,
-                    end=end_time,
-                    summary=summary,
-                    description="\n".join(description_lines),
-                    location=f"{route.long_name} – {origin.stop_name}",
+    grouped: Dict[int, List[int]] = _acquire_dict()
+    try:
+        departures_epoch = departures.departures_epoch
+        for index, wall in enumerate(departures.departures_wall):
+            afternoon = wall % _SECONDS_PER_DAY >= _NOON_SECONDS
+            if afternoon == before_noon:
+                continue
+            service_day = wall // _SECONDS_PER_DAY
+            per_day = grouped.get(service_day)
+            if per_day is None:
+                per_day = grouped[service_day] = _acquire_list()
+            per_day.append(index)
+
+        # Labels are constant per route/direction, so resolve them once per batch.
+        route_label = route.short_name or route.long_name
+        direction_labels: Dict[int, str] = {}
+        description_prefix = (
+            f"Route: {route.long_name}\nOrigin: {origin.stop_name}\nDestination: {destination.stop_name}\nHeadsign: "
+        )
+        location = f"{route.long_name} – {origin.stop_name}"
+        events: List[CalendarEvent] = []
+        for service_day, per_day in grouped.items():
+            service_date = (_WALL_EPOCH + timedelta(days=service_day)).isoformat()
+            per_day.sort(key=departures_epoch.__getitem__)
+            limited = per_day[:MAX_EVENTS_PER_DAY]
+            for index in limited:
+                departure = departures.departure_at(index)
+                arrival = departures.arrival_at(index)
+                trip_id = departures.trip_ids[index]
+                if arrival:
+                    end_time = arrival if arrival > departure else departure + timedelta(minutes=1)
+                else:
+                    end_time = departure + timedelta(minutes=5)
+                direction_id = departures.direction_ids[index]
+                direction_name = direction_labels.get(direction_id)
+                if direction_name is None:
+                    direction_name = direction_labels[direction_id] = _direction_name(route, direction_id)
+                hour = departure.hour
+                time_str = f"{hour % 12 or 12}:{departure.minute:02d} {'AM' if hour < 12 else 'PM'}"
+                summary = f"CR {route_label} – Trip {trip_id} – {direction_name} – {time_str}"
+                description = (
+                    f"{description_prefix}{departures.headsigns[index]}\n"
+                    f"Direction: {direction_name}\n"
+                    f"Trip: {trip_id}\n"
+                    f"Stop sequence: {departures.stop_sequences[index]}\n"
+                    f"Link: {MBTA_TRIP_LINK.format(route=route.route_id, trip=trip_id)}"
                 )
-            )
-    return events
+                events.append(
+                    CalendarEvent(
+                        uid=f"mbta-{route.route_id}-{trip_id}-{origin.stop_id}-{service_date}",
+                        start=departure,
+                        end=end_time,
+                        summary=summary,
+                        description=description,
+                        location=location,
+                    )
+                )
+        return events
+    finally:
+        for per_day in grouped.values():
+            _release_list(per_day)
+        _release_dict(grouped)
 
 
 def _direction_name(route: RouteCandidate, direction_id: int) -> str:
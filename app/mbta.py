@@ -3,16 +3,27 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import random
 from datetime import datetime, timedelta
+from time import monotonic
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
 from zoneinfo import ZoneInfo
 
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
 _DEFAULT_TIMEOUT = httpx.Timeout(connect=3.0, read=5.0, write=5.0, pool=5.0)
 _RETRIES = 2
+_BACKOFF_BASE = 0.3
+_CIRCUIT_THRESHOLD = 5  # consecutive calls failing all retries before short-circuiting
+_CIRCUIT_COOLDOWN = 10.0
+_EASTERN = ZoneInfo("America/New_York")
+_SCHEDULE_PAGE_LIMIT = "500"
+_MAX_CONNECTIONS = 10
+_MAX_IN_FLIGHT = 8  # stays below the pool so fan-out queues here, not on the pool timeout
 
 
 class MBTAAPIError(RuntimeError):
@@ -33,13 +44,16 @@ class MBTAClient:
         headers: Dict[str, str] = {}
         if api_key:
             headers["x-api-key"] = api_key
-        limits = httpx.Limits(max_keepalive_connections=5, max_connections=10)
+        limits = httpx.Limits(max_keepalive_connections=5, max_connections=_MAX_CONNECTIONS)
         self._client = httpx.AsyncClient(
             base_url=self._base_url,
             headers=headers,
             timeout=timeout,
             limits=limits,
         )
+        self._in_flight = asyncio.Semaphore(_MAX_IN_FLIGHT)
+        self._consecutive_failures = 0
+        self._circuit_open_until = 0.0
 
     async def close(self) -> None:
         await self._client.aclose()
@@ -91,34 +105,53 @@ class MBTAClient:
         if end < start:
             raise ValueError("end must be after start")
 
-        results: List[Dict[str, Any]] = []
-        included: Dict[Tuple[str, str], Dict[str, Any]] = {}
-        eastern = ZoneInfo("America/New_York")
-        start_local = start.astimezone(eastern)
-        end_local = end.astimezone(eastern)
+        start_local = start.astimezone(_EASTERN)
+        end_local = end.astimezone(_EASTERN)
         current = start_local.date()
+        start_date = current
         end_date = end_local.date()
+        start_time_str = start_local.strftime("%H:%M")
+        end_time_str = end_local.strftime("%H:%M")
+        include_param = ",".join(include) if include else None
+        # The v3 API only accepts a single service date per schedules request, so
+        # the window is split per day; a large page size keeps each day to one call.
+        day_params: List[Dict[str, Any]] = []
         while current <= end_date:
             params: Dict[str, Any] = {
                 "filter[route]": route_id,
                 "filter[stop]": stop_id,
                 "filter[date]": current.isoformat(),
-                "page[limit]": "200",
+                "page[limit]": _SCHEDULE_PAGE_LIMIT,
                 "sort": "departure_time",
             }
             if direction_id is not None:
                 params["filter[direction_id]"] = str(direction_id)
-            if include:
-                params["include"] = ",".join(include)
+            if include_param:
+                params["include"] = include_param
 
-            if current == start_local.date():
-                params["filter[min_time]"] = start_local.strftime("%H:%M")
+            if current == start_date:
+                params["filter[min_time]"] = start_time_str
             if current == end_date:
-                params["filter[max_time]"] = end_local.strftime("%H:%M")
+                params["filter[max_time]"] = end_time_str
 
-            await self._collect_schedule_page(params, results, included)
+            day_params.append(params)
             current = current + timedelta(days=1)
 
+        # Days are independent requests; fetch them together and merge in date order.
+        pages = await asyncio.gather(*(self._fetch_single_date(params) for params in day_params))
+        results: List[Dict[str, Any]] = []
+        included: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for page_results, page_included in pages:
+            results.extend(page_results)
+            included.update(page_included)
+        return results, included
+
+    async def _fetch_single_date(
+        self, params: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], Dict[Tuple[str, str], Dict[str, Any]]]:
+        results: List[Dict[str, Any]] = []
+        included: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        await self._collect_schedule_page(params, results, included)
         return results, included
 
     async def _collect_schedule_page(
@@ -146,10 +179,14 @@ class MBTAClient:
         page_data = payload.get("data", [])
         page_included = payload.get("included", [])
         results.extend(page_data or [])
-        for item in page_included or []:
-            key = (item.get("type"), item.get("id"))
-            if key[0] and key[1]:
-                included[key] = item
+        if not page_included:
+            return
+        get = dict.get
+        for item in page_included:
+            item_type = get(item, "type")
+            item_id = get(item, "id")
+            if item_type and item_id:
+                included[(item_type, item_id)] = item
 
     async def _get_paginated(self, path: str, *, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         results: List[Dict[str, Any]] = []
@@ -169,12 +206,18 @@ class MBTAClient:
     async def _call(
         self, method: str, path: str, *, params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
+        if self._consecutive_failures >= _CIRCUIT_THRESHOLD and monotonic() < self._circuit_open_until:
+            raise MBTAAPIError("circuit_open")
         last_exc: Optional[Exception] = None
         for attempt in range(_RETRIES + 1):
             try:
-                resp = await self._client.request(method, path, params=params)
+                # Held only for the request itself so backoff sleeps free the slot.
+                async with self._in_flight:
+                    resp = await self._client.request(method, path, params=params)
                 resp.raise_for_status()
-                return resp.json()
+                payload = orjson.loads(resp.content)
+                self._consecutive_failures = 0
+                return payload
             except httpx.HTTPStatusError as exc:
                 if 400 <= exc.response.status_code < 500:
                     logger.warning("MBTA client 4xx %s", exc)
@@ -183,8 +226,15 @@ class MBTAClient:
             except (httpx.TimeoutException, httpx.TransportError) as exc:  # pragma: no cover
                 last_exc = exc
             if attempt < _RETRIES:
-                await asyncio.sleep(0.3 * (attempt + 1))
+                # Full jitter keeps concurrent retries from landing on the same tick.
+                await asyncio.sleep(random.uniform(0, _BACKOFF_BASE * (2**attempt)))
         assert last_exc is not None
+        # One failure per call, counted only once its retries are exhausted, so a
+        # burst of concurrent calls that recover on retry never trips the breaker.
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= _CIRCUIT_THRESHOLD:
+            self._circuit_open_until = monotonic() + _CIRCUIT_COOLDOWN
+            logger.warning("MBTA circuit open for %.0fs after repeated failures", _CIRCUIT_COOLDOWN)
         raise MBTAAPIError(str(last_exc))
 
     @staticmethod
@@ -193,14 +243,14 @@ class MBTAClient:
         next_link = links.get("next")
         if not next_link:
             return None
-        try:
-            # Example: next=/schedules?page[offset]=200
-            _, query = next_link.split("?", 1)
-            for part in query.split("&"):
-                if part.startswith("page[offset]" + "="):
-                    return int(part.split("=", 1)[1])
-        except Exception:  # pragma: no cover - defensive
-            logger.debug("Unable to parse pagination link: %s", next_link)
+        # Example: next=https://api-v3.mbta.com/schedules?page%5Boffset%5D=200&page%5Blimit%5D=200
+        values = parse_qs(urlsplit(next_link).query).get("page[offset]")
+        if values:
+            try:
+                return int(values[0])
+            except ValueError:  # pragma: no cover - defensive
+                pass
+        logger.debug("Unable to parse pagination link: %s", next_link)
         return None
 
 
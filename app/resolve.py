@@ -4,36 +4,52 @@ from __future__ import annotations
 import asyncio
 import logging
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 from time import monotonic
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import AbstractSet, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from .mbta import MBTAClient
 
+try:  # Optional C-accelerated edit distance; the pure-Python path below is the fallback.
+    from rapidfuzz import process as _fuzz_process
+    from rapidfuzz.distance import Levenshtein as _RapidLevenshtein
+except ImportError:  # pragma: no cover - exercised only without rapidfuzz installed
+    _fuzz_process = None
+    _RapidLevenshtein = None
+
 logger = logging.getLogger(__name__)
 
 _SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
 _INDEX_TTL = 60 * 60 * 6  # 6 hours
+_INDEX_SOFT_TTL = _INDEX_TTL / 2  # after this, refresh in the background
+_INDEX_RETRY_TTL = 60 * 5  # soft expiry after a partial refresh, so failed routes retry soon
+_REFRESH_CONCURRENCY = 4  # concurrent per-route stop listings during a refresh
+_RESOLVE_CACHE_LIMIT = 1024
+_MIN_FUZZY_RATIO = 0.6
 
 
+@lru_cache(maxsize=4096)
 def slugify_name(value: str) -> str:
-    slug = _SLUG_PATTERN.sub("-", value.lower().strip())
-    slug = slug.strip("-")
-    slug = re.sub(r"-+", "-", slug)
-    return slug
+    # "-" is itself outside [a-z0-9], so one pass already collapses separator runs.
+    return _SLUG_PATTERN.sub("-", value.lower().strip()).strip("-")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StopCandidate:
     stop_id: str
     stop_name: str
     slug: str
     route_id: str
     route_name: str
+    stop_name_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "stop_name_lower", self.stop_name.lower())
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RouteCandidate:
     route_id: str
     long_name: str
@@ -41,28 +57,88 @@ class RouteCandidate:
     direction_names: Sequence[str]
 
 
+class _TrieNode:
+    """Slug trie node; ``entries`` holds ``(position, candidate)`` for slugs ending here."""
+
+    __slots__ = ("children", "entries")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _TrieNode] = {}
+        self.entries: List[Tuple[int, StopCandidate]] = []
+
+
+def _build_slug_trie(candidates: Sequence[StopCandidate]) -> _TrieNode:
+    root = _TrieNode()
+    for position, candidate in enumerate(candidates):
+        node = root
+        for char in candidate.slug:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+        node.entries.append((position, candidate))
+    return root
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+def _build_trigram_index(candidates: Sequence[StopCandidate]) -> Dict[str, Set[int]]:
+    index: Dict[str, Set[int]] = {}
+    for position, candidate in enumerate(candidates):
+        for gram in _trigrams(candidate.stop_name_lower):
+            index.setdefault(gram, set()).add(position)
+    return index
+
+
+def _log_refresh_failure(task: "asyncio.Task[None]") -> None:
+    # Background refreshes may have no awaiter; surface their failures here.
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("stop index refresh failed: %s", task.exception())
+
+
 class StopIndex:
     """Indexes commuter rail stops grouped by route with slug lookup."""
 
     def __init__(self, client: MBTAClient) -> None:
         self._client = client
-        self._lock = asyncio.Lock()
-        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task[None]] = None
+        self._soft_expires_at = 0.0
+        self._hard_expires_at = 0.0
         self._slug_map: Dict[str, List[StopCandidate]] = {}
         self._all_candidates: List[StopCandidate] = []
+        self._all_slugs: List[str] = []
+        self._slug_trie = _TrieNode()
+        self._trigram_index: Dict[str, Set[int]] = {}
         self._routes: Dict[str, RouteCandidate] = {}
+        self._resolved: Dict[str, List[StopCandidate]] = {}
 
     async def ensure_index(self, force_refresh: bool = False) -> None:
         now = monotonic()
-        if not force_refresh and now < self._expires_at:
+        if not force_refresh and now < self._soft_expires_at:
+            return
+        # Every caller arriving during a refresh awaits the same task; shield it so one
+        # cancelled request cannot abort the refresh the others are waiting on.
+        task = self._refresh_task
+        if task is None or task.done():
+            task = self._refresh_task = asyncio.create_task(self._refresh_and_update_expiry())
+            task.add_done_callback(_log_refresh_failure)
+        if not force_refresh and now < self._hard_expires_at:
+            # Past the soft deadline the current index is still served while the
+            # refresh runs in the background.
             return
-        async with self._lock:
-            if not force_refresh and now < self._expires_at:
-                return
-            await self._refresh()
-            self._expires_at = monotonic() + _INDEX_TTL
+        await asyncio.shield(task)
+
+    async def _refresh_and_update_expiry(self) -> None:
+        complete = await self._refresh()
+        refreshed_at = monotonic()
+        self._soft_expires_at = refreshed_at + (_INDEX_SOFT_TTL if complete else _INDEX_RETRY_TTL)
+        self._hard_expires_at = refreshed_at + _INDEX_TTL
+
+    async def _refresh(self) -> bool:
+        """Rebuild the index; returns ``False`` when some routes kept their previous stops."""
 
-    async def _refresh(self) -> None:
         routes = await self._client.list_commuter_routes()
         slug_map: Dict[str, List[StopCandidate]] = {}
         candidates: List[StopCandidate] = []
@@ -70,19 +146,13 @@ class StopIndex:
 
         for route in routes:
             route_id = route.get("id")
-            attributes = route.get("attributes", {})
-            long_name = attributes.get("long_name") or attributes.get("description") or route_id
-            short_name = attributes.get("short_name")
-            direction_names = attributes.get("direction_names") or []
-            route_map[route_id] = RouteCandidate(
-                route_id=route_id,
-                long_name=long_name,
-                short_name=short_name,
-                direction_names=direction_names,
-            )
+            route_map[route_id] = _route_candidate_from_payload(route_id, route)
+
+        semaphore = asyncio.Semaphore(_REFRESH_CONCURRENCY)
 
         async def load_stops(route: RouteCandidate) -> None:
-            data = await self._client.list_stops(route.route_id)
+            async with semaphore:
+                data = await self._client.list_stops(route.route_id)
             for stop in data:
                 stop_id = stop.get("id")
                 attributes = stop.get("attributes", {})
@@ -98,48 +168,150 @@ class StopIndex:
                 slug_map.setdefault(slug, []).append(candidate)
                 candidates.append(candidate)
 
-        await asyncio.gather(*(load_stops(route) for route in route_map.values()))
+        outcomes = await asyncio.gather(
+            *(load_stops(route) for route in route_map.values()), return_exceptions=True
+        )
+        failures = [
+            (route_id, outcome)
+            for route_id, outcome in zip(route_map, outcomes)
+            if isinstance(outcome, BaseException)
+        ]
+        for route_id, exc in failures:
+            logger.warning("stop listing failed for route %s: %s", route_id, exc)
+        if failures and len(failures) == len(route_map):
+            # Keep serving the previous index rather than replacing it with nothing.
+            raise failures[0][1]
+        if failures:
+            # Carry over what the previous index knew about the failed routes so a
+            # partial refresh never drops their stops.
+            failed_routes = {route_id for route_id, _ in failures}
+            for candidate in self._all_candidates:
+                if candidate.route_id in failed_routes:
+                    slug_map.setdefault(candidate.slug, []).append(candidate)
+                    candidates.append(candidate)
 
         self._slug_map = slug_map
         self._all_candidates = candidates
+        self._all_slugs = [candidate.slug for candidate in candidates]
+        self._slug_trie = _build_slug_trie(candidates)
+        self._trigram_index = _build_trigram_index(candidates)
         self._routes = route_map
+        self._resolved = {}
+        return not failures
 
     async def resolve(self, query: str) -> List[StopCandidate]:
         await self.ensure_index()
         query = query.strip()
         if not query:
             return []
+        # Matching only depends on the lowercased query, so memoize on that until
+        # the next index refresh replaces ``_resolved``.
+        cache_key = query.lower()
+        cached = self._resolved.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        matches = self._match(query)
+        if len(self._resolved) >= _RESOLVE_CACHE_LIMIT:
+            self._resolved.clear()
+        self._resolved[cache_key] = matches
+        return list(matches)
+
+    def _match(self, query: str) -> List[StopCandidate]:
         slug = slugify_name(query)
         matches: List[StopCandidate] = []
 
         if slug and slug in self._slug_map:
             matches.extend(self._slug_map[slug])
 
+        # A stop served by several routes yields one candidate per route, so dedup
+        # on the pair rather than on stop_id alone.
+        seen = {(c.stop_id, c.route_id) for c in matches}
         lowered = query.lower()
-        contains = [c for c in self._all_candidates if lowered in c.stop_name.lower()]
-        for candidate in contains:
-            if candidate not in matches:
+        for candidate in self._substring_candidates(lowered):
+            if lowered not in candidate.stop_name_lower:
+                continue
+            key = (candidate.stop_id, candidate.route_id)
+            if key not in seen:
+                seen.add(key)
                 matches.append(candidate)
 
         if not matches:
-            nearest = self._closest_candidates(query)
+            nearest = self._closest_candidates(slug)
             matches.extend(nearest)
 
         return matches[:10]
 
+    def _substring_candidates(self, lowered: str) -> List[StopCandidate]:
+        """Narrow the substring scan to candidates sharing every trigram of the query."""
+
+        if len(lowered) < 3:
+            return self._all_candidates
+        postings = []
+        for gram in _trigrams(lowered):
+            positions = self._trigram_index.get(gram)
+            if not positions:
+                return []
+            postings.append(positions)
+        postings.sort(key=len)
+        hits = set(postings[0]).intersection(*postings[1:])
+        return [self._all_candidates[position] for position in sorted(hits)]
+
     def route_candidate(self, route_id: str) -> Optional[RouteCandidate]:
         return self._routes.get(route_id)
 
-    def _closest_candidates(self, query: str, limit: int = 5) -> List[StopCandidate]:
-        slug_query = slugify_name(query)
-        scored: List[Tuple[float, StopCandidate]] = []
-        for candidate in self._all_candidates:
-            score = _levenshtein_ratio(slug_query, candidate.slug)
-            if score <= 0.6:
-                continue
-            scored.append((score, candidate))
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return [candidate for _, candidate in scored[:limit]]
+    def _closest_candidates(self, slug_query: str, limit: int = 5) -> List[StopCandidate]:
+        if _fuzz_process is not None:
+            # normalized_similarity is 1 - distance / max(len), the same ratio as below.
+            matches = _fuzz_process.extract(
+                slug_query,
+                self._all_slugs,
+                scorer=_RapidLevenshtein.normalized_similarity,
+                score_cutoff=_MIN_FUZZY_RATIO,
+                limit=None,
+            )
+            # Rank by score, then index position, matching the trie search below.
+            ranked = sorted((-score, position) for _, score, position in matches if score > _MIN_FUZZY_RATIO)
+            return [self._all_candidates[position] for _, position in ranked[:limit]]
+
+        ranked = sorted(_trie_fuzzy_search(self._slug_trie, slug_query))
+        return [self._all_candidates[position] for _, position in ranked[:limit]]
+
+
+def _trie_fuzzy_search(root: _TrieNode, query: str) -> List[Tuple[float, int]]:
+    """Return ``(-ratio, position)`` for slugs whose Levenshtein ratio beats the cutoff.
+
+    Walks the trie carrying one Wagner-Fischer row per node and abandons a subtree
+    once every cell exceeds the largest edit count any viable slug could tolerate;
+    the slugs that survive are scored with ``_levenshtein_ratio``.
+    """
+
+    query_len = len(query)
+    # ratio = 1 - distance / max(len) > cutoff bounds both candidate length and distance.
+    max_len = int(query_len / _MIN_FUZZY_RATIO) if query_len else 0
+    max_edits = int(max_len * (1.0 - _MIN_FUZZY_RATIO))
+    results: List[Tuple[float, int]] = []
+
+    def collect(node: _TrieNode, row: List[int], depth: int) -> None:
+        if node.entries:
+            # Edit distance is at least the length difference, so this bounds the ratio
+            # from above without running the DP.
+            longest = max(query_len, depth)
+            if not longest or 1.0 - abs(query_len - depth) / longest > _MIN_FUZZY_RATIO:
+                ratio = _levenshtein_ratio(query, node.entries[0][1].slug)
+                if ratio > _MIN_FUZZY_RATIO:
+                    results.extend((-ratio, position) for position, _ in node.entries)
+        if depth >= max_len:
+            return
+        for char, child in node.children.items():
+            next_row = [row[0] + 1]
+            for i in range(1, query_len + 1):
+                cost = 0 if query[i - 1] == char else 1
+                next_row.append(min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + cost))
+            if min(next_row) <= max_edits:
+                collect(child, next_row, depth + 1)
+
+    collect(root, list(range(query_len + 1)), 0)
+    return results
 
 
 def _levenshtein_ratio(a: str, b: str) -> float:
@@ -147,22 +319,34 @@ def _levenshtein_ratio(a: str, b: str) -> float:
         return 1.0
     if not a or not b:
         return 0.0
-    len_a, len_b = len(a), len(b)
-    dist = [[0] * (len_b + 1) for _ in range(len_a + 1)]
-    for i in range(len_a + 1):
-        dist[i][0] = i
-    for j in range(len_b + 1):
-        dist[0][j] = j
-    for i in range(1, len_a + 1):
-        for j in range(1, len_b + 1):
-            cost = 0 if a[i - 1] == b[j - 1] else 1
-            dist[i][j] = min(
-                dist[i - 1][j] + 1,
-                dist[i][j - 1] + 1,
-                dist[i - 1][j - 1] + cost,
-            )
-    lev = dist[len_a][len_b]
-    return 1.0 - lev / max(len_a, len_b)
+    longest = max(len(a), len(b))
+    # Shared prefixes and suffixes never contribute edits; drop them before the DP.
+    start = 0
+    limit = min(len(a), len(b))
+    while start < limit and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return 1.0 - len(b) / longest
+    # Two rolling rows of the Wagner-Fischer matrix, sized to the shorter string.
+    prev = list(range(len(a) + 1))
+    curr = [0] * (len(a) + 1)
+    for j, cb in enumerate(b, 1):
+        curr[0] = j
+        for i, ca in enumerate(a, 1):
+            if ca == cb:
+                curr[i] = prev[i - 1]
+            else:
+                curr[i] = 1 + min(prev[i - 1], prev[i], curr[i - 1])
+        prev, curr = curr, prev
+    lev = prev[len(a)]
+    return 1.0 - lev / longest
 
 
 async def infer_route_and_directions(
@@ -171,8 +355,30 @@ async def infer_route_and_directions(
     window_start: datetime,
     window_end: datetime,
     client: MBTAClient,
+    *,
+    index: Optional[StopIndex] = None,
 ) -> Tuple[RouteCandidate, int, int]:
-    """Identify the commuter rail route and direction ids for given stops."""
+    """Identify the commuter rail route and direction ids for given stops.
+
+    Routes already loaded by ``index`` are reused instead of re-fetching their details.
+    """
+
+    # Common case: both stops sit on one route the index already knows, so there is
+    # nothing to rank or fetch before probing directions.
+    shared = index.route_candidate(home.route_id) if index is not None and home.route_id == work.route_id else None
+    if shared is not None:
+        direction = await _find_directions_for_route(
+            client=client,
+            route=shared,
+            home=home,
+            work=work,
+            window_start=window_start,
+            window_end=window_end,
+        )
+        if direction is None:
+            raise ValueError("Unable to infer a route that connects both stops")
+        toward_work, toward_home = direction
+        return shared, toward_work, toward_home
 
     if home.route_id != work.route_id:
         candidates = [home.route_id, work.route_id]
@@ -198,21 +404,16 @@ async def infer_route_and_directions(
         return (priority, route_id)
 
     client_route_cache: Dict[str, RouteCandidate] = {}
-    for rid in ordered:
-        candidate = client_route_cache.get(rid)
-        if candidate is None:
-            route_info = await client.route_details(rid)
-            attributes = route_info.get("attributes", {})
-            direction_names = attributes.get("direction_names") or []
-            long_name = attributes.get("long_name") or attributes.get("description") or rid
-            short_name = attributes.get("short_name")
-            candidate = RouteCandidate(
-                route_id=rid,
-                long_name=long_name,
-                short_name=short_name,
-                direction_names=direction_names,
-            )
-            client_route_cache[rid] = candidate
+    if index is not None:
+        for rid in ordered:
+            candidate = index.route_candidate(rid)
+            if candidate is not None:
+                client_route_cache[rid] = candidate
+    missing = [rid for rid in ordered if rid not in client_route_cache]
+    if missing:
+        details = await asyncio.gather(*(client.route_details(rid) for rid in missing))
+        for rid, route_info in zip(missing, details):
+            client_route_cache[rid] = _route_candidate_from_payload(rid, route_info)
     ordered.sort(key=_route_sort_key)
 
     for route_id in ordered:
@@ -232,6 +433,17 @@ async def infer_route_and_directions(
     raise ValueError("Unable to infer a route that connects both stops")
 
 
+def _route_candidate_from_payload(route_id: str, route: Dict[str, object]) -> RouteCandidate:
+    attributes = route.get("attributes", {})
+    long_name = attributes.get("long_name") or attributes.get("description") or route_id
+    return RouteCandidate(
+        route_id=route_id,
+        long_name=long_name,
+        short_name=attributes.get("short_name"),
+        direction_names=attributes.get("direction_names") or [],
+    )
+
+
 async def _find_directions_for_route(
     *,
     client: MBTAClient,
@@ -242,19 +454,21 @@ async def _find_directions_for_route(
     window_end: datetime,
 ) -> Optional[Tuple[int, int]]:
     try:
-        home_sched, home_included = await client.schedules(
-            route_id=route.route_id,
-            stop_id=home.stop_id,
-            direction_id=None,
-            start=window_start,
-            end=window_end,
-        )
-        work_sched, work_included = await client.schedules(
-            route_id=route.route_id,
-            stop_id=work.stop_id,
-            direction_id=None,
-            start=window_start,
-            end=window_end,
+        (home_sched, home_included), (work_sched, work_included) = await asyncio.gather(
+            client.schedules(
+                route_id=route.route_id,
+                stop_id=home.stop_id,
+                direction_id=None,
+                start=window_start,
+                end=window_end,
+            ),
+            client.schedules(
+                route_id=route.route_id,
+                stop_id=work.stop_id,
+                direction_id=None,
+                start=window_start,
+                end=window_end,
+            ),
         )
     except Exception as exc:  # pragma: no cover - network issues logged upstream
         logger.warning("schedule lookup failed for route %s: %s", route.route_id, exc)
@@ -264,8 +478,12 @@ async def _find_directions_for_route(
     combined_included.update(work_included)
 
     home_map = _trip_stop_sequence_map(home_sched, combined_included)
-    work_map = _trip_stop_sequence_map(work_sched, combined_included)
+    # Only trips that also serve the home stop can connect the pair.
+    work_map = _trip_stop_sequence_map(work_sched, combined_included, trip_id_filter=home_map.keys())
+    if not work_map:
+        return None
 
+    # Walk trips in home schedule order: the first qualifying trip decides the direction.
     for trip_id, home_info in home_map.items():
         work_info = work_map.get(trip_id)
         if work_info is None:
@@ -279,7 +497,12 @@ async def _find_directions_for_route(
     return None
 
 
-@dataclass
+# Shared read-only defaults for missing JSON:API members; never mutate these.
+_EMPTY_ATTRIBUTES: Dict[str, object] = {}
+_EMPTY_TRIP: Dict[str, object] = {"attributes": _EMPTY_ATTRIBUTES}
+
+
+@dataclass(slots=True)
 class _TripStopInfo:
     stop_sequence: Optional[int]
     departure_time: Optional[datetime]
@@ -291,42 +514,46 @@ class _TripStopInfo:
 def _trip_stop_sequence_map(
     data: Sequence[Dict[str, object]],
     included: Dict[Tuple[str, str], Dict[str, object]],
+    *,
+    trip_id_filter: Optional[AbstractSet[str]] = None,
 ) -> Dict[str, _TripStopInfo]:
     mapping: Dict[str, _TripStopInfo] = {}
     for item in data:
-        relationships = item.get("relationships", {})
-        trip = relationships.get("trip", {}) if isinstance(relationships, dict) else {}
-        trip_id = trip.get("data", {}).get("id") if isinstance(trip, dict) else None
-        attributes = item.get("attributes", {}) if isinstance(item, dict) else {}
-        if trip_id and isinstance(attributes, dict):
-            seq = attributes.get("stop_sequence")
-            dep_raw = attributes.get("departure_time")
-            arr_raw = attributes.get("arrival_time")
-            trip_info = included.get(("trip", trip_id))
-            direction_id = None
-            headsign = None
-            if isinstance(trip_info, dict):
-                trip_attr = trip_info.get("attributes", {})
-                if isinstance(trip_attr, dict):
-                    direction = trip_attr.get("direction_id")
-                    if isinstance(direction, int):
-                        direction_id = direction
-                    headsign_value = trip_attr.get("headsign") or trip_attr.get("name")
-                    if isinstance(headsign_value, str):
-                        headsign = headsign_value
-            mapping[trip_id] = _TripStopInfo(
-                stop_sequence=int(seq) if isinstance(seq, int) else None,
-                departure_time=_parse_time(dep_raw),
-                arrival_time=_parse_time(arr_raw),
-                direction_id=direction_id,
-                headsign=headsign,
-            )
+        try:
+            trip_id = item["relationships"]["trip"]["data"]["id"]
+        except (KeyError, TypeError):
+            continue
+        if not trip_id or (trip_id_filter is not None and trip_id not in trip_id_filter):
+            continue
+        attributes = item.get("attributes", _EMPTY_ATTRIBUTES)
+        if not isinstance(attributes, dict):
+            continue
+        trip_attr = (included.get(("trip", trip_id)) or _EMPTY_TRIP).get("attributes", _EMPTY_ATTRIBUTES)
+        if not isinstance(trip_attr, dict):
+            trip_attr = _EMPTY_ATTRIBUTES
+        direction = trip_attr.get("direction_id")
+        headsign = trip_attr.get("headsign") or trip_attr.get("name")
+        seq = attributes.get("stop_sequence")
+        mapping[trip_id] = _TripStopInfo(
+            stop_sequence=seq if isinstance(seq, int) else None,
+            departure_time=_parse_time(attributes.get("departure_time")),
+            arrival_time=_parse_time(attributes.get("arrival_time")),
+            direction_id=direction if isinstance(direction, int) else None,
+            headsign=headsign if isinstance(headsign, str) else None,
+        )
     return mapping
 
 
 def _parse_time(value: object) -> Optional[datetime]:
     if not isinstance(value, str):
         return None
+    return _parse_iso_time(value)
+
+
+@lru_cache(maxsize=8192)
+def _parse_iso_time(value: str) -> Optional[datetime]:
+    # Schedules repeat the same timestamps across stops and requests; datetimes are
+    # immutable, so sharing parsed instances is safe.
     try:
         return datetime.fromisoformat(value)
     except ValueError:
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import cache as cache_module
+from app.cache import TTLCache
+
+
+def test_sharded_cache_get_set_invalidate_and_expiry(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(cache_module, "monotonic", lambda: clock[0])
+
+    cache: TTLCache = TTLCache(default_ttl=10.0)
+    keys = [("route", i) for i in range(64)]
+    for i, key in enumerate(keys):
+        cache.set(key, i)
+    assert all(cache.get(key) == i for i, key in enumerate(keys))
+
+    cache.invalidate(keys[0])
+    assert keys[0] not in cache
+    assert cache.get(keys[1]) == 1
+
+    cache.set("short", "value", ttl=1.0)
+    clock[0] += 5.0
+    assert cache.get("short") is None
+    assert cache.get(keys[2]) == 2
+
+    cache.invalidate()
+    assert all(cache.get(key) is None for key in keys)
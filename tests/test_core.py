@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from pathlib import Path
+from time import monotonic
 from zoneinfo import ZoneInfo
 
 import pytest
@@ -13,7 +14,8 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from app.ics import EASTERN
-from app.main import Departure, _departures_to_events
+from app.main import DepartureTable, _departures_to_events
+from app.mbta import MBTAAPIError
 from app.resolve import RouteCandidate, StopCandidate, StopIndex, infer_route_and_directions, slugify_name
 
 
@@ -175,20 +177,28 @@ async def test_route_inference_prefers_correct_direction_order():
     assert toward_work == 0
     assert toward_home == 1
 
+    # Routes already indexed are reused without another route_details call.
+    index = StopIndex(client)
+    await index.ensure_index()
+    client._route_details = {}
+    route, toward_work, toward_home = await infer_route_and_directions(home, work, start, end, client, index=index)
+    assert route.long_name == "Franklin/Foxboro Line"
+    assert (toward_work, toward_home) == (0, 1)
 
-def _make_departure(hour: int, minute: int, direction: int, trip_id: str) -> Departure:
-    dt = datetime(2024, 4, 1, hour, minute, tzinfo=EASTERN)
-    return Departure(
-        trip_id=trip_id,
-        departure=dt,
-        arrival=dt + timedelta(minutes=30),
-        stop_sequence=5,
-        direction_id=direction,
-        headsign="South Station",
-        service_date=dt,
-        origin_stop_id="place-forgp",
-        destination_stop_id="place-sstat",
-    )
+
+def _make_departures(*rows: tuple[int, int, int, str]) -> DepartureTable:
+    table = DepartureTable()
+    for hour, minute, direction, trip_id in rows:
+        dt = datetime(2024, 4, 1, hour, minute, tzinfo=EASTERN)
+        table.append(
+            trip_id=trip_id,
+            departure=dt,
+            arrival=dt + timedelta(minutes=30),
+            stop_sequence=5,
+            direction_id=direction,
+            headsign="South Station",
+        )
+    return table
 
 
 def test_noon_partition_and_uid_stability():
@@ -213,8 +223,8 @@ def test_noon_partition_and_uid_stability():
         route_name="Franklin/Foxboro Line",
     )
 
-    morning = [_make_departure(8, 15, 0, "Trip-1"), _make_departure(12, 0, 0, "Trip-2")]
-    evening = [_make_departure(17, 30, 1, "Trip-3"), _make_departure(11, 59, 1, "Trip-4")]
+    morning = _make_departures((8, 15, 0, "Trip-1"), (12, 0, 0, "Trip-2"))
+    evening = _make_departures((17, 30, 1, "Trip-3"), (11, 59, 1, "Trip-4"))
 
     morning_events = _departures_to_events(route, origin=home, destination=work, departures=morning, before_noon=True)
     assert len(morning_events) == 1
@@ -227,3 +237,226 @@ def test_noon_partition_and_uid_stability():
     # UID stability: running conversion again produces same UID
     second_pass = _departures_to_events(route, origin=work, destination=home, departures=evening, before_noon=False)
     assert second_pass[0].uid == evening_events[0].uid
+
+
+def test_calendar_etag_tracks_departure_content():
+    from app.main import _calendar_etag, _departures_fingerprint, _etag_matches
+
+    route = RouteCandidate(
+        route_id="CR-Line",
+        long_name="Franklin/Foxboro Line",
+        short_name="Franklin",
+        direction_names=["Inbound", "Outbound"],
+    )
+    home = StopCandidate(
+        stop_id="place-forgp",
+        stop_name="Forge Park/495",
+        slug="forge-park-495",
+        route_id="CR-Line",
+        route_name="Franklin/Foxboro Line",
+    )
+    work = StopCandidate(
+        stop_id="place-sstat",
+        stop_name="South Station",
+        slug="south-station",
+        route_id="CR-Line",
+        route_name="Franklin/Foxboro Line",
+    )
+
+    morning = _make_departures((8, 15, 0, "Trip-1"))
+    evening = _make_departures((17, 30, 1, "Trip-3"))
+    etag = _calendar_etag(route, home, work, _departures_fingerprint(morning), _departures_fingerprint(evening))
+    again = _calendar_etag(route, home, work, _departures_fingerprint(_make_departures((8, 15, 0, "Trip-1"))), _departures_fingerprint(evening))
+    assert etag == again
+    assert etag.startswith('W/"')
+    assert _etag_matches(etag, etag)
+    assert _etag_matches(f'"other", {etag[2:]}', etag)
+    assert not _etag_matches(None, etag)
+
+    shifted = _make_departures((8, 20, 0, "Trip-1"))
+    changed = _calendar_etag(route, home, work, _departures_fingerprint(shifted), _departures_fingerprint(evening))
+    assert changed != etag
+
+
+def test_schedule_ical_answers_matching_if_none_match_with_304(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import main as main_module
+
+    route = RouteCandidate(
+        route_id="CR-Line",
+        long_name="Franklin/Foxboro Line",
+        short_name="Franklin",
+        direction_names=["Outbound", "Inbound"],
+    )
+
+    async def fake_infer(*args, **kwargs):
+        return route, 1, 0
+
+    departure = (datetime.now(tz=EASTERN) + timedelta(days=1)).replace(hour=8, minute=15, second=0, microsecond=0)
+
+    def row(when: datetime) -> dict:
+        return {
+            "attributes": {"departure_time": when.isoformat(), "arrival_time": when.isoformat(), "stop_sequence": 1},
+            "relationships": {"trip": {"data": {"id": "Trip-1"}}},
+        }
+
+    client = FakeMBTAClient(
+        routes=[{"id": "CR-Line", "attributes": {"long_name": "Franklin/Foxboro Line"}}],
+        stops_by_route={
+            "CR-Line": [
+                {"id": "place-forgp", "attributes": {"name": "Forge Park/495"}},
+                {"id": "place-sstat", "attributes": {"name": "South Station"}},
+            ]
+        },
+        schedule_payloads={
+            ("CR-Line", "place-forgp", 1): ([row(departure)], {}),
+            ("CR-Line", "place-sstat", 1): ([row(departure + timedelta(minutes=40))], {}),
+        },
+        route_details_map={},
+    )
+    index = StopIndex(client)
+    monkeypatch.setattr(main_module, "infer_route_and_directions", fake_infer)
+    monkeypatch.setitem(main_module.app.dependency_overrides, main_module.get_client, lambda: client)
+    monkeypatch.setitem(main_module.app.dependency_overrides, main_module.get_stop_index, lambda: index)
+
+    params = {"home_stop": "Forge Park/495", "work_stop": "South Station"}
+    with TestClient(main_module.app) as http:
+        first = http.get("/schedule.ical", params=params)
+        assert first.status_code == 200
+        assert b"Trip-1" in first.content
+        etag = first.headers["etag"]
+        # The body embeds a per-render DTSTAMP, so the validator must be weak.
+        assert etag.startswith('W/"')
+
+        cached = http.get("/schedule.ical", params=params, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+        stale = http.get("/schedule.ical", params=params, headers={"If-None-Match": '"stale"'})
+        assert stale.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "2024-03-15T06:05:00-04:00",
+        "2024-03-15T06:05:00-05:00",
+        "2024-11-03T01:30:00-04:00",
+        "2024-11-03T01:30:00-05:00",
+        "2024-07-01T12:00:00Z",
+    ],
+)
+def test_parse_mbta_ts_matches_fromisoformat(raw):
+    from app.main import _parse_mbta_ts
+
+    parsed = _parse_mbta_ts(raw)
+    expected = datetime.fromisoformat(raw).astimezone(EASTERN)
+    assert parsed == expected
+    assert (parsed.hour, parsed.minute, parsed.utcoffset()) == (expected.hour, expected.minute, expected.utcoffset())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_rapidfuzz", [True, False])
+async def test_resolution_fuzzy_fallback_ranks_closest_stop(monkeypatch, use_rapidfuzz):
+    import app.resolve as resolve_module
+
+    if not use_rapidfuzz:
+        monkeypatch.setattr(resolve_module, "_fuzz_process", None)
+    elif resolve_module._fuzz_process is None:
+        pytest.skip("rapidfuzz not installed")
+    names = ["Forge Park/495", "South Station", "Franklin", "Norwood Central", "Mansfield", "Back Bay"]
+    client = FakeMBTAClient(
+        routes=[{"id": "CR-Line", "attributes": {"long_name": "Franklin/Foxboro Line"}}],
+        stops_by_route={"CR-Line": [{"id": f"stop-{i}", "attributes": {"name": name}} for i, name in enumerate(names)]},
+        schedule_payloads={},
+        route_details_map={},
+    )
+    index = StopIndex(client)
+
+    matches = await index.resolve("Mansfeild")
+    assert [m.stop_name for m in matches] == ["Mansfield"]
+
+    matches = await index.resolve("norwod centrl")
+    assert matches[0].stop_name == "Norwood Central"
+
+    assert await index.resolve("zzzzzz") == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_resolves_share_one_index_refresh():
+    import asyncio
+
+    class CountingClient(FakeMBTAClient):
+        refreshes = 0
+
+        async def list_commuter_routes(self):
+            CountingClient.refreshes += 1
+            await asyncio.sleep(0)
+            return await super().list_commuter_routes()
+
+    client = CountingClient(
+        routes=[{"id": "CR-Line", "attributes": {"long_name": "Franklin/Foxboro Line"}}],
+        stops_by_route={"CR-Line": [{"id": "place-sstat", "attributes": {"name": "South Station"}}]},
+        schedule_payloads={},
+        route_details_map={},
+    )
+    index = StopIndex(client)
+    results = await asyncio.gather(*(index.resolve("South Station") for _ in range(5)))
+    assert all(matches and matches[0].stop_id == "place-sstat" for matches in results)
+    assert CountingClient.refreshes == 1
+
+
+@pytest.mark.asyncio
+async def test_soft_expired_index_refreshes_in_background():
+    client = FakeMBTAClient(
+        routes=[{"id": "CR-Line", "attributes": {"long_name": "Franklin/Foxboro Line"}}],
+        stops_by_route={"CR-Line": [{"id": "place-sstat", "attributes": {"name": "South Station"}}]},
+        schedule_payloads={},
+        route_details_map={},
+    )
+    index = StopIndex(client)
+    await index.ensure_index()
+
+    client._stops = {"CR-Line": [{"id": "place-bbsta", "attributes": {"name": "Back Bay"}}]}
+    index._soft_expires_at = 0.0
+    # Stale data is served immediately while the refresh runs behind it.
+    assert (await index.resolve("South Station"))[0].stop_id == "place-sstat"
+    await index._refresh_task
+    assert (await index.resolve("Back Bay"))[0].stop_id == "place-bbsta"
+
+
+@pytest.mark.asyncio
+async def test_partial_refresh_keeps_failed_route_stops_and_retries_soon():
+    from app import resolve as resolve_module
+
+    client = FakeMBTAClient(
+        routes=[
+            {"id": "CR-Franklin", "attributes": {"long_name": "Franklin/Foxboro Line"}},
+            {"id": "CR-Worcester", "attributes": {"long_name": "Framingham/Worcester Line"}},
+        ],
+        stops_by_route={
+            "CR-Franklin": [{"id": "place-forgp", "attributes": {"name": "Forge Park/495"}}],
+            "CR-Worcester": [{"id": "place-WML-0442", "attributes": {"name": "Worcester"}}],
+        },
+        schedule_payloads={},
+        route_details_map={},
+    )
+    index = StopIndex(client)
+    await index.ensure_index()
+
+    list_stops = client.list_stops
+
+    async def flaky_list_stops(route_id: str):
+        if route_id == "CR-Worcester":
+            raise MBTAAPIError("boom")
+        return await list_stops(route_id)
+
+    client.list_stops = flaky_list_stops
+    client._stops["CR-Franklin"] = [{"id": "place-FB-0303", "attributes": {"name": "Franklin"}}]
+    await index.ensure_index(force_refresh=True)
+
+    assert (await index.resolve("Franklin"))[0].stop_id == "place-FB-0303"
+    assert (await index.resolve("Worcester"))[0].stop_id == "place-WML-0442"
+    assert index._soft_expires_at - monotonic() <= resolve_module._INDEX_RETRY_TTL
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from icalendar import Calendar
+
+from app.ics import EASTERN, CalendarEvent, build_calendar
+
+
+def test_build_calendar_folds_and_escapes_lines():
+    start = datetime(2024, 4, 1, 7, 15, tzinfo=EASTERN)
+    description = "\n".join(f"Line {i}: Forge Park/495 – South Station; trip, stop" for i in range(4))
+    event = CalendarEvent(
+        uid="mbta-CR-Line-Trip-1-place-forgp-2024-04-01",
+        start=start,
+        end=start + timedelta(minutes=50),
+        summary="CR Franklin – Trip Trip-1 – Inbound – 7:15 AM",
+        description=description,
+        location="Franklin/Foxboro Line – Forge Park/495",
+    )
+
+    payload = build_calendar([event], start)
+
+    for line in payload.split(b"\r\n"):
+        assert len(line) <= 75
+        line.decode("utf-8")  # folding must not split multi-byte characters
+
+    parsed = Calendar.from_ical(payload)
+    (vevent,) = parsed.walk("VEVENT")
+    assert str(vevent["DESCRIPTION"]) == description
+    assert str(vevent["SUMMARY"]) == event.summary
+    assert vevent["DTSTART"].dt == start
+    assert vevent["DTSTART"].params["TZID"] == "America/New_York"
+    assert parsed.walk("VTIMEZONE")
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import httpx
+import pytest
+
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.mbta import MBTAClient
+
+
+def _client_with(handler) -> MBTAClient:
+    client = MBTAClient(base_url="https://mbta.test")
+    client._client = httpx.AsyncClient(base_url="https://mbta.test", transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_schedules_merges_pages_in_date_order():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        seen.append(dict(params))
+        date = params["filter[date]"]
+        offset = int(params.get("page[offset]", "0"))
+        data = [{"id": f"{date}-{offset}", "attributes": {}}]
+        payload = {
+            "data": data,
+            "included": [{"type": "trip", "id": f"trip-{date}"}],
+            "links": {},
+        }
+        if offset == 0:
+            payload["links"]["next"] = "https://mbta.test/schedules?page%5Boffset%5D=1&page%5Blimit%5D=1"
+        return httpx.Response(200, json=payload)
+
+    eastern = ZoneInfo("America/New_York")
+    async with _client_with(handler) as client:
+        results, included = await client.schedules(
+            route_id="CR-Line",
+            stop_id="place-forgp",
+            direction_id=0,
+            start=datetime(2024, 4, 1, 6, 30, tzinfo=eastern),
+            end=datetime(2024, 4, 3, 23, 59, tzinfo=eastern),
+        )
+
+    assert [item["id"] for item in results] == [
+        "2024-04-01-0",
+        "2024-04-01-1",
+        "2024-04-02-0",
+        "2024-04-02-1",
+        "2024-04-03-0",
+        "2024-04-03-1",
+    ]
+    assert set(included) == {("trip", f"trip-2024-04-0{day}") for day in (1, 2, 3)}
+    first_day = [params for params in seen if params["filter[date]"] == "2024-04-01" and "page[offset]" not in params]
+    assert first_day[0]["filter[min_time]"] == "06:30"
+
+
+@pytest.mark.asyncio
+async def test_call_opens_circuit_after_repeated_failures(monkeypatch):
+    from app import mbta as mbta_module
+    from app.mbta import MBTAAPIError
+
+    monkeypatch.setattr(mbta_module.random, "uniform", lambda low, high: 0)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(503, json={"errors": []})
+
+    async with _client_with(handler) as client:
+        for _ in range(mbta_module._CIRCUIT_THRESHOLD):
+            with pytest.raises(MBTAAPIError):
+                await client.route_details("CR-Line")
+        # Every failed call exhausts its retries before counting once.
+        expected = mbta_module._CIRCUIT_THRESHOLD * (mbta_module._RETRIES + 1)
+        assert len(calls) == expected
+        with pytest.raises(MBTAAPIError, match="circuit_open"):
+            await client.route_details("CR-Line")
+        assert len(calls) == expected
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_recovering_on_retry_keep_circuit_closed(monkeypatch):
+    from app import mbta as mbta_module
+
+    monkeypatch.setattr(mbta_module.random, "uniform", lambda low, high: 0)
+    failed_once = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        key = str(request.url)
+        if key not in failed_once:
+            failed_once.add(key)
+            return httpx.Response(502, json={"errors": []})
+        date = request.url.params["filter[date]"]
+        return httpx.Response(200, json={"data": [{"id": date, "attributes": {}}], "included": [], "links": {}})
+
+    eastern = ZoneInfo("America/New_York")
+    async with _client_with(handler) as client:
+        results, _ = await client.schedules(
+            route_id="CR-Line",
+            stop_id="place-forgp",
+            direction_id=0,
+            start=datetime(2024, 4, 1, 0, 0, tzinfo=eastern),
+            end=datetime(2024, 4, 14, 23, 59, tzinfo=eastern),
+        )
+        assert client._consecutive_failures == 0
+
+    assert [item["id"] for item in results] == [f"2024-04-{day:02d}" for day in range(1, 15)]
+
+
+@pytest.mark.asyncio
+async def test_schedule_fan_out_stays_below_connection_pool():
+    from app import mbta as mbta_module
+
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return httpx.Response(200, json={"data": [], "included": [], "links": {}})
+
+    eastern = ZoneInfo("America/New_York")
+    async with _client_with(handler) as client:
+        await client.schedules(
+            route_id="CR-Line",
+            stop_id="place-forgp",
+            direction_id=0,
+            start=datetime(2024, 4, 1, 0, 0, tzinfo=eastern),
+            end=datetime(2024, 4, 30, 23, 59, tzinfo=eastern),
+        )
+
+    assert 1 < peak <= mbta_module._MAX_IN_FLIGHT < mbta_module._MAX_CONNECTIONS